@@ -1,46 +1,78 @@
-from abc import ABC, abstractmethod
+import logging
+from typing import Protocol
 import traci
+import traci.constants as tc
 import random
 
-class ConsensusAlgorithm(ABC):
+try:
+    import numpy as np
+    from numba import njit
+except ImportError:  # numba (及其依赖 numpy) 为可选依赖，缺失时使用纯 Python 循环
+    njit = None
+
+logger = logging.getLogger(__name__)
+
+
+class SimulationAlgorithm(Protocol):
+    """
+    SimulationManager 所需的算法接口 (结构化类型，仅用于类型标注)。
+    任何实现了 update(step) 的对象都满足该接口，无需继承下面的基类。
+    """
+    def update(self, step: int) -> None:
+        ...
+
+
+if njit is not None:
+    @njit(cache=True, fastmath=True)
+    def _apply_commands_kernel(speeds, accels, out, dt, min_speed, max_speed):
+        """根据加速度指令计算新速度: out = clip(v + a * dt, min_speed, max_speed)"""
+        for i in range(speeds.shape[0]):
+            out[i] = min(max(speeds[i] + accels[i] * dt, min_speed), max_speed)
+
+
+class ConsensusAlgorithm:
     """
     共识算法的抽象基类。
     用于实现车辆间的协调和决策。
     """
-    @abstractmethod
+    __slots__ = ()
+
     def update(self, step: int):
         """在每个仿真步长调用此方法。"""
-        pass
+        raise NotImplementedError
 
-class NetworkingProtocol(ABC):
+class NetworkingProtocol:
     """
     网络协议的抽象基类。
     用于模拟车辆之间或车辆与基础设施之间的通信。
     """
-    @abstractmethod
+    __slots__ = ()
+
     def update(self, step: int):
         """在每个仿真步长调用此方法。"""
-        pass
+        raise NotImplementedError
 
-class DrivingStrategy(ABC):
+class DrivingStrategy:
     """
     驾驶策略的抽象基类。
     用于定义单个车辆的驾驶行为。
     """
-    @abstractmethod
+    __slots__ = ()
+
     def update(self, step: int):
         """在每个仿真步长调用此方法。"""
-        pass
+        raise NotImplementedError
 
-class SchedulingAlgorithm(ABC):
+class SchedulingAlgorithm:
     """
     调度算法的抽象基类。
     用于实现交通信号灯调度或车辆路径规划。
     """
-    @abstractmethod
+    __slots__ = ()
+
     def update(self, step: int):
         """在每个仿真步长调用此方法。"""
-        pass
+        raise NotImplementedError
 
 # --- 算法实现示例 ---
 # 您可以在下面创建自己的算法实现，并替换runner.py中的占位符。
@@ -51,6 +83,7 @@ class MyConsensus(ConsensusAlgorithm):
     
     可视化事件类型 (发送到前端):
     - message: {"type": "message", "from": "veh_id", "to": "veh_id"|"broadcast", "msgType": "PREPARE"|"COMMIT"|"REPLY"}
+    - multicast: {"type": "multicast", "from": ["veh_id", ...], "to": "veh_id"|["veh_id", ...]|"broadcast", "msgType": "PREPARE"|"COMMIT"|"REPLY"}
     - state_change: {"type": "state_change", "vehicle": "veh_id", "state": "idle"|"preparing"|"committed"|"failed"}
     - consensus_progress: {"type": "consensus_progress", "phase": "prepare"|"commit", "current": int, "required": int}
     - decision_zone: {"type": "decision_zone", "vehicles": ["veh_id", ...], "active": bool}
@@ -71,8 +104,7 @@ class MyConsensus(ConsensusAlgorithm):
     
     def get_events(self) -> list:
         """获取并清空待发送的事件队列"""
-        events = self._pending_events.copy()
-        self._pending_events.clear()
+        events, self._pending_events = self._pending_events, []
         return events
 
 class MyNetworking(NetworkingProtocol):
@@ -112,8 +144,7 @@ class MyNetworking(NetworkingProtocol):
     
     def get_events(self) -> list:
         """获取并清空待发送的事件队列"""
-        events = self._pending_events.copy()
-        self._pending_events.clear()
+        events, self._pending_events = self._pending_events, []
         return events
 
 import random
@@ -132,91 +163,246 @@ class MyDrivingStrategy(DrivingStrategy):
     MAX_SPEED = 20.0
     MIN_SPEED = 0.0
 
+    # 仿真步长 (s)
+    DT = 0.1
+
+    # 控制的路口 (同时也是交通灯ID)
+    JUNCTION_ID = "J0"
+    # 决策区域: 距停车线的距离 (m)
+    DECISION_DIST = 30.0
+    # 路口上下文订阅半径 (m)，以路口中心为圆心，需覆盖决策区域与路口自身尺寸
+    SUBSCRIBE_RANGE = 50.0
+    # 通过上下文订阅批量获取的车辆变量
+    VEHICLE_VARS = (
+        tc.VAR_SPEED,
+        tc.VAR_ACCELERATION,
+        tc.VAR_ROAD_ID,
+        tc.VAR_LANE_ID,
+        tc.VAR_LANEPOSITION,
+        tc.VAR_ROUTE_ID,
+    )
+
+    # 注意: 本类使用 __slots__，实例上不能随意添加新属性。
+    # 在 __init__ 或其他方法中新增 self.xxx = ... 时，必须同时把 "xxx" 加入下面的元组，
+    # 否则会抛出 AttributeError。
+    __slots__ = (
+        "_subscribed",
+        "_lane_len",
+        "_is_in_edge",
+        "_pending_writes",
+        "_speed_mode_state",
+        "_speed_buf",
+        "_accel_buf",
+        "_out_buf",
+    )
+
     def __init__(self):
-        self.initialized_vehicles = set()
+        # 订阅需在 TraCI 连接建立后进行，因此延迟到第一次 update
+        self._subscribed = False
+        # 路网是静态的: 车道长度、edge 是否为驶入路口的 edge 只需计算一次
+        self._lane_len = {}
+        self._is_in_edge = {}
+        # 本步待下发的写指令 (setter, veh_id, value)，在 update 结束时集中发送
+        self._pending_writes = []
+        # 每辆车最近一次下发的 SpeedMode，模式未变化时不再重复写入
+        self._speed_mode_state = {}
+        # 加速度 -> 速度计算使用的预分配缓冲区 (仅在 numba 可用时使用)，
+        # 决策车辆数超过容量时扩容
+        if njit is not None:
+            self._speed_buf = np.empty(16, dtype=np.float64)
+            self._accel_buf = np.empty(16, dtype=np.float64)
+            self._out_buf = np.empty(16, dtype=np.float64)
+
+    def _subscribe(self):
+        """
+        订阅路口周边车辆、交通灯状态和新出发车辆。
+        订阅结果随 simulationStep 的响应一起返回，之后每步只需读取本地缓存，
+        不再为每辆车单独发起 TraCI 请求。
+        """
+        traci.junction.subscribeContext(
+            self.JUNCTION_ID, tc.CMD_GET_VEHICLE_VARIABLE, self.SUBSCRIBE_RANGE, self.VEHICLE_VARS
+        )
+        traci.trafficlight.subscribe(
+            self.JUNCTION_ID, (tc.TL_RED_YELLOW_GREEN_STATE, tc.TL_CURRENT_PHASE)
+        )
+        traci.simulation.subscribe((tc.VAR_DEPARTED_VEHICLES_IDS, tc.VAR_ARRIVED_VEHICLES_IDS))
+        self._subscribed = True
+
+    def _ensure_buffers(self, n: int):
+        """保证速度计算缓冲区至少能容纳 n 辆车"""
+        if n > self._speed_buf.shape[0]:
+            size = max(n, 2 * self._speed_buf.shape[0])
+            self._speed_buf = np.empty(size, dtype=np.float64)
+            self._accel_buf = np.empty(size, dtype=np.float64)
+            self._out_buf = np.empty(size, dtype=np.float64)
+
+    def _load_topology(self):
+        """预先读取全部车道长度并对 edge 分类 (只处理进入路口的 edge，即以 _in 结尾)"""
+        for lane_id in traci.lane.getIDList():
+            self._lane_len[lane_id] = traci.lane.getLength(lane_id)
+        for edge_id in traci.edge.getIDList():
+            self._is_in_edge[edge_id] = edge_id.endswith("_in")
+
+    def _lane_length(self, lane_id: str) -> float:
+        """返回车道长度 (带缓存)"""
+        length = self._lane_len.get(lane_id)
+        if length is None:
+            length = self._lane_len[lane_id] = traci.lane.getLength(lane_id)
+        return length
+
+    def _in_edge(self, edge_id: str) -> bool:
+        """edge 是否为驶入路口的 edge (带缓存)"""
+        is_in = self._is_in_edge.get(edge_id)
+        if is_in is None:
+            is_in = self._is_in_edge[edge_id] = edge_id.endswith("_in")
+        return is_in
+
+    def _set_speed_mode(self, veh_id: str, mode: int):
+        """记录 SpeedMode 写指令；与上次下发的模式相同时直接跳过"""
+        if self._speed_mode_state.get(veh_id) != mode:
+            self._speed_mode_state[veh_id] = mode
+            self._pending_writes.append((traci.vehicle.setSpeedMode, veh_id, mode))
+
+    def _set_speed(self, veh_id: str, speed: float):
+        """记录 setSpeed 写指令"""
+        self._pending_writes.append((traci.vehicle.setSpeed, veh_id, speed))
+
+    def _flush_writes(self):
+        """连续下发本步累积的全部写指令，中间不穿插任何读取"""
+        TraCIException = traci.TraCIException
+        for setter, veh_id, value in self._pending_writes:
+            try:
+                setter(veh_id, value)
+            except TraCIException:
+                # 车辆可能已在本步离开仿真
+                continue
+        self._pending_writes.clear()
 
     def update(self, step: int):
         """
         在每个仿真步长调用此方法。
         """
-        # 1. 采样间隔检查 (0.2s = 2 steps)
+        if not self._subscribed:
+            self._load_topology()
+            self._subscribe()
+
+        # 1. 已到达的车辆: 清除其状态；新出发的车辆: 着色并请求最大速度
+        #    (出发列表只包含本步的车辆，因此必须在采样间隔检查之前处理；
+        #     setSpeed 会一直生效，车辆进入决策区域前无需重复下发)
+        sim_results = traci.simulation.getSubscriptionResults()
+        for veh_id in sim_results.get(tc.VAR_ARRIVED_VEHICLES_IDS, ()):
+            self._speed_mode_state.pop(veh_id, None)
+
+        # 出发列表中的车辆都是新车辆，无需再检查是否已初始化
+        for veh_id in sim_results.get(tc.VAR_DEPARTED_VEHICLES_IDS, ()):
+            self._pending_writes.append((traci.vehicle.setColor, veh_id, (255, 255, 0, 255))) # 黄色
+            self._set_speed(veh_id, self.MAX_SPEED)
+            # 新车辆使用默认 SpeedMode (31)
+            self._speed_mode_state[veh_id] = 31
+
+        # 2. 采样间隔检查 (0.2s = 2 steps)
         if step % 2 != 0:
+            self._flush_writes()
             return
 
-        # 2. 获取红绿灯信息
-        junction_id = "J0"
-        try:
-            tl_state = traci.trafficlight.getRedYellowGreenState(junction_id)
-            tl_phase = traci.trafficlight.getPhase(junction_id)
-        except traci.TraCIException:
-            tl_state = ""
-            tl_phase = -1
-        
-        tl_info = {
-            "id": junction_id,
-            "state": tl_state,
-            "phase": tl_phase
-        }
+        # 3. 获取路口附近的车辆信息 (来自上下文订阅缓存，SUMO 已按订阅半径过滤)
+        nearby = traci.junction.getContextSubscriptionResults(self.JUNCTION_ID)
+        if not nearby:
+            # 路口附近没有车辆，本步无需任何决策
+            self._flush_writes()
+            return
 
-        # 3. 获取车辆信息并分类
-        vehicle_ids = traci.vehicle.getIDList()
+        # 4. 对车辆分类
         decision_vehicles = {}
-        
-        for veh_id in vehicle_ids:
-            if veh_id not in self.initialized_vehicles:
-                traci.vehicle.setColor(veh_id, (255, 255, 0, 255)) # 黄色
-                self.initialized_vehicles.add(veh_id)
 
+        # 循环内使用的方法和常量预先绑定为局部变量，避免每辆车重复查找属性
+        in_edge = self._in_edge
+        lane_length = self._lane_length
+        set_speed_mode = self._set_speed_mode
+        set_speed = self._set_speed
+        decision_dist = self.DECISION_DIST
+        max_speed = self.MAX_SPEED
+        var_road_id = tc.VAR_ROAD_ID
+        var_lane_id = tc.VAR_LANE_ID
+        var_lane_pos = tc.VAR_LANEPOSITION
+        var_speed = tc.VAR_SPEED
+        var_accel = tc.VAR_ACCELERATION
+        var_route_id = tc.VAR_ROUTE_ID
+        TraCIException = traci.TraCIException
+
+        for veh_id, data in nearby.items():
             try:
-                lane_id = traci.vehicle.getLaneID(veh_id)
-                edge_id = traci.vehicle.getRoadID(veh_id)
-                
+                edge_id = data[var_road_id]
+
                 # 只处理进入路口的车辆 (edge以_in结尾)
-                if edge_id.endswith("_in"):
-                    lane_len = traci.lane.getLength(lane_id)
-                    lane_pos = traci.vehicle.getLanePosition(veh_id)
-                    dist_to_junction = lane_len - lane_pos
-                    
-                    if dist_to_junction <= 30.0:
+                if in_edge(edge_id):
+                    lane_id = data[var_lane_id]
+                    dist_to_junction = lane_length(lane_id) - data[var_lane_pos]
+
+                    if dist_to_junction <= decision_dist:
                         # --- 进入决策区域 (<= 30m) ---
                         # 收集信息传给策略
                         veh_info = {
                             "id": veh_id,
-                            "speed": traci.vehicle.getSpeed(veh_id),
-                            "acceleration": traci.vehicle.getAcceleration(veh_id),
-                            "route": traci.vehicle.getRouteID(veh_id),
+                            "speed": data[var_speed],
+                            "acceleration": data[var_accel],
+                            "route": data[var_route_id],
                             "dist_to_junction": dist_to_junction,
                             "lane_id": lane_id
                         }
                         decision_vehicles[veh_id] = veh_info
-                        
+
                         # 设置为手动控制模式 (SpeedMode 0), 允许完全控制加速度
-                        traci.vehicle.setSpeedMode(veh_id, 0)
+                        set_speed_mode(veh_id, 0)
                     else:
                         # --- 决策区域外 (> 30m) ---
                         # 保持最大速度 (恢复默认SpeedMode或设置为最大速度)
                         # 这里我们使用默认的CarFollowing模型，但请求最大速度
-                        traci.vehicle.setSpeedMode(veh_id, 31) # 恢复默认行为
-                        traci.vehicle.setSpeed(veh_id, self.MAX_SPEED)
+                        set_speed_mode(veh_id, 31) # 恢复默认行为
+                        set_speed(veh_id, max_speed)
                 else:
                     # --- 已经在路口内或离开路口 ---
                     # 恢复默认行为
-                    traci.vehicle.setSpeedMode(veh_id, 31)
+                    set_speed_mode(veh_id, 31)
 
-            except traci.TraCIException:
+            except (KeyError, TraCIException):
                 continue
 
-        # 4. 调用策略接口并应用控制
+        # 5. 获取红绿灯信息 (来自订阅缓存)，调用策略接口并应用控制
         if decision_vehicles:
+            tl_results = traci.trafficlight.getSubscriptionResults(self.JUNCTION_ID) or {}
+            tl_info = {
+                "id": self.JUNCTION_ID,
+                "state": tl_results.get(tc.TL_RED_YELLOW_GREEN_STATE, ""),
+                "phase": tl_results.get(tc.TL_CURRENT_PHASE, -1)
+            }
             commands = self.compute_strategy(step, decision_vehicles, tl_info)
-            
-            for veh_id, accel_cmd in commands.items():
-                if veh_id in decision_vehicles:
-                    # 应用加速度控制
-                    # 根据加速度计算新速度 (v_new = v + a * dt, dt=0.1s per step)
+            controlled = [veh_id for veh_id in commands if veh_id in decision_vehicles]
+            n = len(controlled)
+
+            if n and njit is None:
+                # 应用加速度控制
+                # 根据加速度计算新速度 (v_new = v + a * dt, dt=0.1s per step)
+                for veh_id in controlled:
                     current_speed = decision_vehicles[veh_id]['speed']
-                    new_speed = max(self.MIN_SPEED, min(current_speed + accel_cmd * 0.1, self.MAX_SPEED))
-                    traci.vehicle.setSpeed(veh_id, new_speed)
+                    new_speed = max(self.MIN_SPEED, min(current_speed + commands[veh_id] * self.DT, self.MAX_SPEED))
+                    self._set_speed(veh_id, new_speed)
+            elif n:
+                # 同上，由 Numba 编译的内核批量计算
+                self._ensure_buffers(n)
+                speeds = self._speed_buf[:n]
+                accels = self._accel_buf[:n]
+                new_speeds = self._out_buf[:n]
+                for i, veh_id in enumerate(controlled):
+                    speeds[i] = decision_vehicles[veh_id]['speed']
+                    accels[i] = commands[veh_id]
+                _apply_commands_kernel(speeds, accels, new_speeds, self.DT, self.MIN_SPEED, self.MAX_SPEED)
+
+                for veh_id, new_speed in zip(controlled, new_speeds.tolist()):
+                    self._set_speed(veh_id, new_speed)
+
+        # 6. 集中下发本步的全部写指令
+        self._flush_writes()
 
     def compute_strategy(self, step: int, vehicle_data: dict, traffic_light_data: dict) -> dict:
         """
@@ -234,9 +420,14 @@ class MyDrivingStrategy(DrivingStrategy):
         commands = {}
         
         # --- 实时数据打印 (用于验证) ---
-        print(f"\n[Strategy] Step {step} | TL Phase: {traffic_light_data['phase']} | State: {traffic_light_data['state']}")
-        print(f"{'Vehicle ID':<15} | {'Dist (m)':<10} | {'Speed (m/s)':<12} | {'Accel (m/s^2)':<15} | {'Command':<10}")
-        print("-" * 70)
+        # 仅在 DEBUG 级别下格式化，整张表拼接后一次性输出
+        debug = logger.isEnabledFor(logging.DEBUG)
+        if debug:
+            rows = [
+                f"\n[Strategy] Step {step} | TL Phase: {traffic_light_data['phase']} | State: {traffic_light_data['state']}",
+                f"{'Vehicle ID':<15} | {'Dist (m)':<10} | {'Speed (m/s)':<12} | {'Accel (m/s^2)':<15} | {'Command':<10}",
+                "-" * 70,
+            ]
 
         # TODO: 其他开发者将在此处实现具体的策略逻辑
         # 目前作为占位符，所有车辆保持匀速
@@ -248,35 +439,57 @@ class MyDrivingStrategy(DrivingStrategy):
             commands[veh_id] = command
             
             # 打印每辆车的数据和决策
-            print(f"{veh_id:<15} | {info['dist_to_junction']:<10.2f} | {info['speed']:<12.2f} | {info['acceleration']:<15.2f} | {command:<10}")
+            if debug:
+                rows.append(f"{veh_id:<15} | {info['dist_to_junction']:<10.2f} | {info['speed']:<12.2f} | {info['acceleration']:<15.2f} | {command:<10}")
+
+        if debug:
+            logger.debug("\n".join(rows))
             
         return commands
 
 class MyTrafficLightScheduling(SchedulingAlgorithm):
     """一个简单的交通灯调度示例。"""
+    __slots__ = ("junction_id", "phase_index", "_phases", "_n_phases", "_steps_until_switch")
+
+    # 相位切换间隔 (步)
+    SWITCH_INTERVAL = 30
+
     def __init__(self, junction_id: str):
         self.junction_id = junction_id
         self.phase_index = 0
         self._phases = None
+        self._n_phases = 0
+        # 距下一次切换相位还剩的步数
+        self._steps_until_switch = 0
 
-    @property
-    def phases(self):
-        if self._phases is None:
-            # Lazy load phases once traci is connected
-            try:
-                self._phases = traci.trafficlight.getCompleteRedYellowGreenDefinition(self.junction_id)[0].phases
-            except traci.TraCIException:
-                # Traci not connected yet
-                pass
-        return self._phases
+    def _ensure_phases(self, step: int) -> bool:
+        """
+        读取交通灯的相位定义 (只需成功一次)，并计算距下一次切换的步数。
+        TraCI 尚未连接时返回 False。
+        """
+        try:
+            self._phases = traci.trafficlight.getCompleteRedYellowGreenDefinition(self.junction_id)[0].phases
+        except traci.TraCIException:
+            # Traci not connected yet
+            return False
+        self._n_phases = len(self._phases)
+        # 在 SWITCH_INTERVAL 的整数倍 (不含第 0 步) 处切换
+        if step == 0:
+            self._steps_until_switch = self.SWITCH_INTERVAL
+        else:
+            self._steps_until_switch = -step % self.SWITCH_INTERVAL
+        return True
 
     def update(self, step: int):
-        if self.phases is None:
+        if self._phases is None and not self._ensure_phases(step):
             return
             
         # 每30步切换一次交通灯相位
-        if step > 0 and step % 30 == 0:
-            self.phase_index = (self.phase_index + 1) % len(self.phases)
-            traci.trafficlight.setPhase(self.junction_id, self.phase_index)
-            # print(f"[Scheduling] Step {step}: Switched TLS '{self.junction_id}' to phase {self.phase_index}")
-        pass
+        if self._steps_until_switch:
+            self._steps_until_switch -= 1
+            return
+
+        self._steps_until_switch = self.SWITCH_INTERVAL - 1
+        self.phase_index = (self.phase_index + 1) % self._n_phases
+        traci.trafficlight.setPhase(self.junction_id, self.phase_index)
+        # print(f"[Scheduling] Step {step}: Switched TLS '{self.junction_id}' to phase {self.phase_index}")
@@ -1,5 +1,6 @@
 import asyncio
 import json
+import logging
 import os
 import sys
 import threading
@@ -10,6 +11,11 @@ try:
 except ImportError as exc:  # pragma: no cover - runtime env check
     raise SystemExit("依赖缺失: 请先运行 pip install websockets") from exc
 
+try:
+    import orjson  # type: ignore
+except ImportError:  # pragma: no cover - optional speedup
+    orjson = None
+
 import traci
 
 import algorithms  # 导入算法模块
@@ -21,6 +27,13 @@ else:
     sys.exit("请设置环境变量 'SUMO_HOME'")
 
 
+def dumps_payload(payload) -> str:
+    """序列化推送给前端的数据帧 (优先使用 orjson)。前端按文本帧解析，因此返回 str。"""
+    if orjson is not None:
+        return orjson.dumps(payload).decode("utf-8")
+    return json.dumps(payload)
+
+
 class SumoWebsocketStreamer:
     """Minimal WebSocket broadcaster that pushes SUMO vehicle state to clients."""
 
@@ -106,11 +119,11 @@ class SimulationManager:
     仿真管理器，用于设置和运行SUMO仿真。
     """
     def __init__(self, sumo_cmd, max_steps,
-                 driving_strategy=None,
-                 scheduling_algo=None,
-                 consensus_algo=None,
-                 networking_proto=None,
-                 vehicle_generator=None,
+                 driving_strategy: Optional[algorithms.SimulationAlgorithm] = None,
+                 scheduling_algo: Optional[algorithms.SimulationAlgorithm] = None,
+                 consensus_algo: Optional[algorithms.SimulationAlgorithm] = None,
+                 networking_proto: Optional[algorithms.SimulationAlgorithm] = None,
+                 vehicle_generator: Optional[algorithms.SimulationAlgorithm] = None,
                  stream_port: Optional[int] = 8765):
         self.sumo_cmd = sumo_cmd
         self.max_steps = max_steps
@@ -210,7 +223,7 @@ class SimulationManager:
                     if self.networking_proto and hasattr(self.networking_proto, 'get_events'):
                         events.extend(self.networking_proto.get_events())
                     
-                    payload = json.dumps({
+                    payload = dumps_payload({
                         "step": step, 
                         "vehicles": vehicles, 
                         "tls": tls,
@@ -227,6 +240,10 @@ class SimulationManager:
                 self.streamer.stop()
 
 if __name__ == "__main__":
+    # --- 日志 ---
+    # 改为 logging.DEBUG 可打印驾驶策略每个决策步的数据表
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
+
     # --- 仿真参数 ---
     sumoBinary = "sumo-gui"  # 使用 "sumo-gui" 或 "sumo"
     sumoCmd = [sumoBinary, "-c", "crossroad.sumocfg"]
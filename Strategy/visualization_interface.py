@@ -12,12 +12,18 @@
 示例见本文件底部的 ExamplePBFTConsensus 类。
 """
 
-from abc import ABC, abstractmethod
-from typing import List, Dict, Any, Optional, Literal
+from typing import List, Dict, Any, Optional, Literal, Sequence, Deque
+from collections import deque
 from dataclasses import dataclass
 from enum import Enum
+import json
 import traci
 
+try:
+    import orjson
+except ImportError:  # orjson 为可选依赖，缺失时使用标准库 json
+    orjson = None
+
 
 # ============================================================
 # 枚举类型定义
@@ -53,6 +59,16 @@ class ConsensusPhase(Enum):
     REPLY = "reply"
 
 
+# 枚举成员 -> 事件中使用的字符串值 (原始字符串同样映射到自身)，
+# emit_* 方法通过一次字典查找完成转换，未命中时才退回 str()
+_MSG_VALUES: Dict[Any, str] = {m: m.value for m in MessageType}
+_MSG_VALUES.update({m.value: m.value for m in MessageType})
+_STATE_VALUES: Dict[Any, str] = {s: s.value for s in VehicleState}
+_STATE_VALUES.update({s.value: s.value for s in VehicleState})
+_PHASE_VALUES: Dict[Any, str] = {p: p.value for p in ConsensusPhase}
+_PHASE_VALUES.update({p.value: p.value for p in ConsensusPhase})
+
+
 # ============================================================
 # 可视化基类
 # ============================================================
@@ -61,10 +77,14 @@ class VisualizableMixin:
     """
     可视化功能混入类。
     提供事件发送的基础设施。
+
+    待发送事件保存在 deque 中: 追加与整体取走 (换上新队列) 均为 O(1)，
+    也可以用 drain_up_to 从队首分批取出。
     """
+    __slots__ = ("_pending_events",)
     
     def __init__(self):
-        self._pending_events: List[Dict[str, Any]] = []
+        self._pending_events: Deque[Dict[str, Any]] = deque()
     
     def get_events(self) -> List[Dict[str, Any]]:
         """
@@ -74,16 +94,43 @@ class VisualizableMixin:
         Returns:
             待发送的事件列表
         """
-        events = self._pending_events.copy()
-        self._pending_events.clear()
-        return events
+        events = self._pending_events
+        self._pending_events = deque()
+        return list(events)
+    
+    def drain_up_to(self, n: int) -> List[Dict[str, Any]]:
+        """
+        从队首取出最多 n 个事件，其余事件留在队列中。
+        用于限制每次推送给前端的事件数量 (例如前端处理速度跟不上仿真时)。
+        
+        Args:
+            n: 本次最多取出的事件数
+        
+        Returns:
+            按发送顺序排列的事件列表
+        """
+        popleft = self._pending_events.popleft
+        return [popleft() for _ in range(min(n, len(self._pending_events)))]
+    
+    def dump_events_json(self) -> bytes:
+        """
+        获取并清空待发送的事件队列，并直接序列化为 JSON。
+        安装了 orjson 时使用 orjson (C 实现)，否则退回标准库 json。
+        
+        Returns:
+            UTF-8 编码的 JSON 数组
+        """
+        events = self.get_events()
+        if orjson is not None:
+            return orjson.dumps(events)
+        return json.dumps(events).encode("utf-8")
     
     def _emit(self, event: Dict[str, Any]) -> None:
         """内部方法：将事件加入队列"""
         self._pending_events.append(event)
 
 
-class VisualizableConsensus(VisualizableMixin, ABC):
+class VisualizableConsensus(VisualizableMixin):
     """
     可视化共识算法基类。
     
@@ -100,11 +147,11 @@ class VisualizableConsensus(VisualizableMixin, ABC):
                     # 更新车辆状态
                     self.emit_state_change(vehicles[0], VehicleState.PREPARING)
     """
+    __slots__ = ()
     
     def __init__(self):
         super().__init__()
     
-    @abstractmethod
     def update(self, step: int) -> None:
         """
         每个仿真步长调用此方法。
@@ -113,7 +160,7 @@ class VisualizableConsensus(VisualizableMixin, ABC):
         Args:
             step: 当前仿真步数
         """
-        pass
+        raise NotImplementedError
     
     # ---- 消息可视化 ----
     
@@ -142,7 +189,7 @@ class VisualizableConsensus(VisualizableMixin, ABC):
             "type": "message",
             "from": from_id,
             "to": to_id,
-            "msgType": msg_type.value if isinstance(msg_type, MessageType) else str(msg_type)
+            "msgType": _MSG_VALUES.get(msg_type) or str(msg_type)
         }
         if data:
             event["data"] = data
@@ -165,6 +212,36 @@ class VisualizableConsensus(VisualizableMixin, ABC):
         """
         self.emit_message(from_id, "broadcast", msg_type, data)
     
+    def emit_multicast(
+        self,
+        from_ids: List[str],
+        msg_type: MessageType,
+        to_id: Any = "broadcast",
+        data: Optional[Dict] = None
+    ) -> None:
+        """
+        多个发送方同时发送同类消息，只生成一个事件。
+        前端将其展开为每个发送方各一条消息，效果等同于逐个调用 emit_message。
+        
+        Args:
+            from_ids: 发送方车辆ID列表
+            msg_type: 消息类型
+            to_id: 接收方车辆ID、接收方ID列表，或 "broadcast" (默认)
+            data: 附加数据 (可选)
+        
+        示例:
+            self.emit_multicast(["veh_0", "veh_1", "veh_2"], MessageType.COMMIT)
+        """
+        event = {
+            "type": "multicast",
+            "from": list(from_ids),
+            "to": to_id,
+            "msgType": _MSG_VALUES.get(msg_type) or str(msg_type)
+        }
+        if data:
+            event["data"] = data
+        self._emit(event)
+    
     # ---- 状态可视化 ----
     
     def emit_state_change(
@@ -187,7 +264,7 @@ class VisualizableConsensus(VisualizableMixin, ABC):
         self._emit({
             "type": "state_change",
             "vehicle": vehicle_id,
-            "state": state.value if isinstance(state, VehicleState) else str(state)
+            "state": _STATE_VALUES.get(state) or str(state)
         })
     
     # ---- 进度可视化 ----
@@ -214,7 +291,7 @@ class VisualizableConsensus(VisualizableMixin, ABC):
         """
         self._emit({
             "type": "consensus_progress",
-            "phase": phase.value if isinstance(phase, ConsensusPhase) else str(phase),
+            "phase": _PHASE_VALUES.get(phase) or str(phase),
             "current": current,
             "required": required
         })
@@ -276,18 +353,18 @@ class VisualizableConsensus(VisualizableMixin, ABC):
         self.emit_topology([])
 
 
-class VisualizableNetworking(VisualizableMixin, ABC):
+class VisualizableNetworking(VisualizableMixin):
     """
     可视化网络协议基类。
     
     继承此类并实现 update() 方法来创建你的网络协议。
     使用 send_message() 方法发送消息，同时自动生成可视化事件。
     """
+    __slots__ = ()
     
     def __init__(self):
         super().__init__()
     
-    @abstractmethod
     def update(self, step: int) -> None:
         """
         每个仿真步长调用此方法。
@@ -296,7 +373,7 @@ class VisualizableNetworking(VisualizableMixin, ABC):
         Args:
             step: 当前仿真步数
         """
-        pass
+        raise NotImplementedError
     
     def send_message(
         self,
@@ -318,7 +395,7 @@ class VisualizableNetworking(VisualizableMixin, ABC):
             "type": "message",
             "from": from_id,
             "to": to_id,
-            "msgType": msg_type.value if isinstance(msg_type, MessageType) else str(msg_type)
+            "msgType": _MSG_VALUES.get(msg_type) or str(msg_type)
         }
         if data:
             event["data"] = data
@@ -350,16 +427,24 @@ class ExamplePBFTConsensus(VisualizableConsensus):
         from visualization_interface import ExamplePBFTConsensus
         my_consensus = ExamplePBFTConsensus()
     """
+    __slots__ = (
+        "phase", "round_start_step", "participants", "leader",
+        "_followers", "_quorum", "_prepare_bits", "_commit_bits"
+    )
     
     def __init__(self):
         super().__init__()
         self.phase = "idle"
-        self.votes = {}
         self.round_start_step = 0
         self.participants = []
         self.leader = None
+        self._followers = []  # 本轮除 Leader 外的参与者
+        self._quorum = 0      # PREPARE 阶段所需票数
+        # 投票位掩码: 第 i 位表示 participants[i] 已投票
+        self._prepare_bits = 0
+        self._commit_bits = 0
     
-    def update(self, step: int):
+    def update(self, step: int, vehicles: Optional[Sequence[str]] = None):
         """
         简化的 PBFT 流程演示:
         1. 每100步启动一次新的共识轮次
@@ -367,8 +452,13 @@ class ExamplePBFTConsensus(VisualizableConsensus):
         3. 节点发送 PREPARE
         4. 收集到足够 PREPARE 后发送 COMMIT
         5. 收集到足够 COMMIT 后完成
+        
+        Args:
+            step: 当前仿真步数
+            vehicles: 本步的车辆ID序列 (可选)。调用方已获取时传入可省去一次 TraCI 查询
         """
-        vehicles = list(traci.vehicle.getIDList())
+        if vehicles is None:
+            vehicles = traci.vehicle.getIDList()
         
         if len(vehicles) < 3:
             return  # 需要至少3个节点
@@ -389,13 +479,16 @@ class ExamplePBFTConsensus(VisualizableConsensus):
         elif self.phase == "commit" and steps_in_round >= 25:
             self._finish_round()
     
-    def _start_new_round(self, step: int, vehicles: List[str]):
+    def _start_new_round(self, step: int, vehicles: Sequence[str]):
         """启动新的共识轮次"""
         self.phase = "pre-prepare"
         self.round_start_step = step
-        self.participants = vehicles[:5]  # 最多5个参与者
+        self.participants = list(vehicles[:5])  # 最多5个参与者
         self.leader = self.participants[0]
-        self.votes = {"prepare": set(), "commit": set()}
+        self._followers = [n for n in self.participants if n != self.leader]
+        self._quorum = len(self._followers)
+        self._prepare_bits = 0
+        self._commit_bits = 0
         
         # 可视化: 设置 Leader 状态
         self.emit_state_change(self.leader, VehicleState.LEADER)
@@ -413,38 +506,38 @@ class ExamplePBFTConsensus(VisualizableConsensus):
         """PREPARE 阶段"""
         self.phase = "prepare"
         
-        # 所有节点发送 PREPARE
-        for i, node in enumerate(self.participants):
-            if node != self.leader:
-                # 可视化: 发送 PREPARE 消息给 Leader
-                self.emit_message(node, self.leader, MessageType.PREPARE)
-                # 可视化: 更新节点状态
-                self.emit_state_change(node, VehicleState.PREPARING)
-                self.votes["prepare"].add(node)
+        # 除 Leader 外的所有节点发送 PREPARE
+        # (Leader 是 participants[0]，其余节点在 participants 中的下标从 1 开始)
+        for idx, node in enumerate(self._followers, 1):
+            # 可视化: 发送 PREPARE 消息给 Leader
+            self.emit_message(node, self.leader, MessageType.PREPARE)
+            # 可视化: 更新节点状态
+            self.emit_state_change(node, VehicleState.PREPARING)
+            self._prepare_bits |= 1 << idx
         
         # 可视化: 更新进度条
         self.emit_progress(
             ConsensusPhase.PREPARE, 
-            len(self.votes["prepare"]), 
-            len(self.participants) - 1
+            bin(self._prepare_bits).count("1"), 
+            self._quorum
         )
     
     def _do_commit_phase(self):
         """COMMIT 阶段"""
         self.phase = "commit"
         
-        # 所有节点发送 COMMIT
-        for node in self.participants:
-            # 可视化: 广播 COMMIT
-            self.emit_broadcast(node, MessageType.COMMIT)
+        # 可视化: 所有节点广播 COMMIT (合并为一个事件)
+        self.emit_multicast(self.participants, MessageType.COMMIT)
+        
+        for idx, node in enumerate(self.participants):
             # 可视化: 更新状态
             self.emit_state_change(node, VehicleState.COMMITTING)
-            self.votes["commit"].add(node)
+            self._commit_bits |= 1 << idx
         
         # 可视化: 更新进度条
         self.emit_progress(
             ConsensusPhase.COMMIT,
-            len(self.votes["commit"]),
+            bin(self._commit_bits).count("1"),
             len(self.participants)
         )
     
@@ -465,6 +558,8 @@ class ExamplePBFTConsensus(VisualizableConsensus):
         # 清理
         self.participants = []
         self.leader = None
+        self._followers = []
+        self._quorum = 0
 
 
 # ============================================================
@@ -6,27 +6,66 @@
 import numpy as np
 import pickle
 import sys
+from typing import Optional
 from ga_traffic_strategy import GeneticTrafficStrategy
 
-def visualize_strategy(strategy: GeneticTrafficStrategy):
+try:
+    import matplotlib
+    from matplotlib.figure import Figure
+except ImportError:  # 热力图为可选功能
+    matplotlib = None
+    Figure = None
+
+# 染色体按 [灯态, 距离, 速度] 排列
+STRATEGY_SHAPE = (2, 5, 4)      # 新版40状态: 连续加速度
+OLD_STRATEGY_SHAPE = (2, 3, 3)  # 旧版18状态: 动作索引
+
+# 热力图复用同一个 Figure (不经过 pyplot，无需切换后端)，每次导出前清空
+_HEATMAP_FIG = Figure(figsize=(16, 6), constrained_layout=True) if Figure is not None else None
+HEATMAP_DPI = 150
+
+
+def chromosome_array(strategy: GeneticTrafficStrategy) -> np.ndarray:
+    """
+    将染色体转换为连续的 NumPy 数组 (不修改 strategy)
+    
+    新版策略为 float64 的 (2, 5, 4)，旧版为整数的 (2, 3, 3)；
+    未知长度保持一维，由调用方给出警告。
+    可视化函数的 states 参数接收此结果，以便多次调用时只转换一次。
+    """
+    chromosome = strategy.chromosome
+    if len(chromosome) == 40:
+        return np.ascontiguousarray(chromosome, dtype=np.float64).reshape(STRATEGY_SHAPE)
+    elif len(chromosome) == 18:
+        return np.ascontiguousarray(chromosome, dtype=np.intp).reshape(OLD_STRATEGY_SHAPE)
+    return np.ascontiguousarray(chromosome)
+
+# 加速度方向标记: (-inf, -2.0) 强减速, [-2.0, -0.5) 减速, [-0.5, 0.5) 维持, [0.5, inf) 加速
+_BINS = np.array([-2.0, -0.5, 0.5])
+_MARKERS = ("↓↓", "↓", "→", "↑")
+
+
+def visualize_strategy(strategy: GeneticTrafficStrategy, states: Optional[np.ndarray] = None):
     """
     以表格形式展示策略的所有决策
     
     Args:
         strategy: 要可视化的策略
+        states: chromosome_array(strategy) 的结果，None 时现算
     """
     print("\n" + "="*90)
     print("策略决策表可视化".center(90))
     print("="*90)
     
-    chromosome = strategy.chromosome
+    if states is None:
+        states = chromosome_array(strategy)
     
     # 检测策略版本
-    if len(chromosome) == 18:
-        visualize_old_strategy(strategy)
+    if states.shape == OLD_STRATEGY_SHAPE:
+        visualize_old_strategy(strategy, states)
         return
-    elif len(chromosome) != 40:
-        print(f"警告: 未知的染色体长度 {len(chromosome)}")
+    elif states.shape != STRATEGY_SHAPE:
+        print(f"警告: 未知的染色体长度 {states.size}")
         return
     
     # 新版40状态策略
@@ -37,42 +76,25 @@ def visualize_strategy(strategy: GeneticTrafficStrategy):
     print("\n说明: 表格显示不同状态下的加速度决策 (单位: m/s²)")
     print("="*90)
     
+    # 一次性计算所有状态的标记下标 (side='right' 使边界值归入上一档)
+    marker_idx = np.searchsorted(_BINS, states.ravel(), side="right").reshape(states.shape)
+    
+    # 表头
+    header = f"{'距离':<12}" + "".join(f"{speed_range:>16}" for speed_range in speed_ranges)
+    
     for light_idx, light_state in enumerate(light_states):
-        print(f"\n[{light_state}]")
-        print("-"*90)
+        rows = [f"\n[{light_state}]", "-"*90, header, "-"*90]
         
-        # 表头
-        print(f"{'距离':<12}", end="")
-        for speed_range in speed_ranges:
-            print(f"{speed_range:>16}", end="")
-        print()
-        print("-"*90)
-        
-        # 数据行
+        # 数据行，带方向标记
         for dist_idx, dist_range in enumerate(dist_ranges):
-            print(f"{dist_range:<12}", end="")
-            
-            for speed_idx in range(len(speed_ranges)):
-                # 计算状态索引
-                state_idx = light_idx * 20 + dist_idx * 4 + speed_idx
-                accel = chromosome[state_idx]
-                
-                # 格式化输出，带颜色标记
-                if accel < -2.0:
-                    marker = "↓↓"  # 强减速
-                elif accel < -0.5:
-                    marker = "↓"   # 减速
-                elif accel < 0.5:
-                    marker = "→"   # 维持
-                else:
-                    marker = "↑"   # 加速
-                
-                print(f"{accel:>7.2f}{marker:<7}", end="")
-            print()
-        print()
+            cells = [f"{accel:>7.2f}{_MARKERS[m]:<7}"
+                     for accel, m in zip(states[light_idx, dist_idx], marker_idx[light_idx, dist_idx])]
+            rows.append(f"{dist_range:<12}" + "".join(cells))
+        rows.append("")
+        print("\n".join(rows))
 
 
-def visualize_old_strategy(strategy: GeneticTrafficStrategy):
+def visualize_old_strategy(strategy: GeneticTrafficStrategy, states: Optional[np.ndarray] = None):
     """可视化旧版18状态策略"""
     print("\n检测到旧版策略 (18状态)")
     
@@ -85,54 +107,47 @@ def visualize_old_strategy(strategy: GeneticTrafficStrategy):
     dist_ranges = ["0-10m", "10-20m", "20-30m"]
     speed_ranges = ["0-5m/s", "5-15m/s", "15-20m/s"]
     light_states = ["绿灯", "红灯"]
+    if states is None:
+        states = chromosome_array(strategy)
+    
+    header = f"{'距离':<12}" + "".join(f"{speed_range:>15}" for speed_range in speed_ranges)
     
     for light_idx, light_state in enumerate(light_states):
-        print(f"\n[{light_state}]")
-        print("-"*70)
-        
-        print(f"{'距离':<12}", end="")
-        for speed_range in speed_ranges:
-            print(f"{speed_range:>15}", end="")
-        print()
-        print("-"*70)
+        rows = [f"\n[{light_state}]", "-"*70, header, "-"*70]
         
         for dist_idx, dist_range in enumerate(dist_ranges):
-            print(f"{dist_range:<12}", end="")
-            
-            for speed_idx in range(len(speed_ranges)):
-                state_idx = light_idx * 9 + dist_idx * 3 + speed_idx
-                action_idx = strategy.chromosome[state_idx]
-                accel = strategy.ACCEL_OPTIONS[action_idx]
-                action_str = action_map[accel]
-                
-                print(f"{action_str:>15}", end="")
-            print()
-        print()
+            cells = [f"{action_map[strategy.ACCEL_OPTIONS[action_idx]]:>15}"
+                     for action_idx in states[light_idx, dist_idx]]
+            rows.append(f"{dist_range:<12}" + "".join(cells))
+        rows.append("")
+        print("\n".join(rows))
 
 
-def analyze_strategy_patterns(strategy: GeneticTrafficStrategy):
+def analyze_strategy_patterns(strategy: GeneticTrafficStrategy, states: Optional[np.ndarray] = None):
     """
     分析策略的决策模式
     
     Args:
         strategy: 要分析的策略
+        states: chromosome_array(strategy) 的结果，None 时现算
     """
     print("\n" + "="*90)
     print("策略模式分析".center(90))
     print("="*90)
     
-    chromosome = strategy.chromosome
+    if states is None:
+        states = chromosome_array(strategy)
     
-    if len(chromosome) == 18:
+    if states.shape == OLD_STRATEGY_SHAPE:
         analyze_old_strategy_patterns(strategy)
         return
-    elif len(chromosome) != 40:
-        print(f"警告: 未知的染色体长度 {len(chromosome)}")
+    elif states.shape != STRATEGY_SHAPE:
+        print(f"警告: 未知的染色体长度 {states.size}")
         return
     
     # 分离红绿灯策略
-    green_actions = chromosome[:20]
-    red_actions = chromosome[20:]
+    green_actions = states[0].ravel()
+    red_actions = states[1].ravel()
     
     print(f"\n决策统计:")
     print(f"{'类别':<20} {'绿灯':<20} {'红灯':<20}")
@@ -145,13 +160,13 @@ def analyze_strategy_patterns(strategy: GeneticTrafficStrategy):
     print(f"{'标准差':<20} {np.std(green_actions):>18.2f} {np.std(red_actions):>18.2f}")
     
     # 决策分布
-    green_decel = sum(1 for a in green_actions if a < -0.5)
-    green_maintain = sum(1 for a in green_actions if -0.5 <= a <= 0.5)
-    green_accel = sum(1 for a in green_actions if a > 0.5)
+    green_decel = int(np.count_nonzero(green_actions < -0.5))
+    green_accel = int(np.count_nonzero(green_actions > 0.5))
+    green_maintain = 20 - green_decel - green_accel
     
-    red_decel = sum(1 for a in red_actions if a < -0.5)
-    red_maintain = sum(1 for a in red_actions if -0.5 <= a <= 0.5)
-    red_accel = sum(1 for a in red_actions if a > 0.5)
+    red_decel = int(np.count_nonzero(red_actions < -0.5))
+    red_accel = int(np.count_nonzero(red_actions > 0.5))
+    red_maintain = 20 - red_decel - red_accel
     
     print(f"\n决策分布:")
     print(f"  绿灯: 减速={green_decel}({green_decel/20*100:.0f}%), "
@@ -166,11 +181,11 @@ def analyze_strategy_patterns(strategy: GeneticTrafficStrategy):
     print(f"  红灯时减速比例: {red_decel/20*100:.1f}%")
     
     # 近距离策略
-    near_red_actions = [red_actions[i] for i in range(8)]  # 0-10m
-    print(f"  近距离(0-10m)红灯平均加速度: {np.mean(near_red_actions):.2f} m/s²")
+    near_red_actions = red_actions[:8]  # 0-10m
+    print(f"  近距离(0-10m)红灯平均加速度: {near_red_actions.mean():.2f} m/s²")
     
     # 紧急制动检测
-    emergency_red = sum(1 for a in near_red_actions if a < -2.5)
+    emergency_red = int(np.count_nonzero(near_red_actions < -2.5))
     print(f"  近距离红灯紧急制动(<-2.5)比例: {emergency_red/8*100:.1f}%")
 
 
@@ -198,128 +213,108 @@ def analyze_old_strategy_patterns(strategy: GeneticTrafficStrategy):
     print(f"  红灯时减速: {red_decel_count}/9 ({red_decel_count/9*100:.1f}%)")
 
 
-def export_strategy_heatmap(strategy: GeneticTrafficStrategy, filename: str = "strategy_heatmap.png"):
+def export_strategy_heatmap(strategy: GeneticTrafficStrategy, filename: str = "strategy_heatmap.png",
+                            states: Optional[np.ndarray] = None):
     """
     导出策略的热力图
     
     Args:
         strategy: 要可视化的策略
         filename: 保存文件名
+        states: chromosome_array(strategy) 的结果，None 时现算
     """
-    try:
-        import matplotlib.pyplot as plt
-        import matplotlib
-        matplotlib.use('Agg')
-        
-        chromosome = strategy.chromosome
-        
-        if len(chromosome) == 18:
-            export_old_strategy_heatmap(strategy, filename)
-            return
-        elif len(chromosome) != 40:
-            print(f"警告: 未知的染色体长度 {len(chromosome)}")
-            return
-        
-        # 创建数据矩阵
-        green_states = np.zeros((5, 4))  # 5距离 x 4速度
-        red_states = np.zeros((5, 4))
-        
-        for i in range(40):
-            light_idx = i // 20
-            remaining = i % 20
-            dist_idx = remaining // 4
-            speed_idx = remaining % 4
-            
-            if light_idx == 0:
-                green_states[dist_idx, speed_idx] = chromosome[i]
-            else:
-                red_states[dist_idx, speed_idx] = chromosome[i]
-        
-        # 绘图
-        fig, (ax1, ax2) = plt.subplots(1, 2, figsize=(16, 6))
-        
-        dist_labels = ['0-5m\n(很近)', '5-10m\n(近)', '10-15m\n(中)', '15-20m\n(远)', '20-30m\n(很远)']
-        speed_labels = ['0-3m/s\n(慢)', '3-8m/s\n(中慢)', '8-13m/s\n(中快)', '13-20m/s\n(快)']
-        
-        vmin, vmax = -4.0, 2.0
-        
-        # 绿灯状态
-        im1 = ax1.imshow(green_states, cmap='RdYlGn', vmin=vmin, vmax=vmax, aspect='auto')
-        ax1.set_xticks(range(4))
-        ax1.set_yticks(range(5))
-        ax1.set_xticklabels(speed_labels, fontsize=9)
-        ax1.set_yticklabels(dist_labels, fontsize=9)
-        ax1.set_xlabel('速度', fontsize=11, fontweight='bold')
-        ax1.set_ylabel('距离路口', fontsize=11, fontweight='bold')
-        ax1.set_title('策略决策: 绿灯', fontsize=13, fontweight='bold', color='green')
-        
-        for i in range(5):
-            for j in range(4):
-                value = green_states[i, j]
-                color = 'white' if abs(value) > 1.5 else 'black'
-                ax1.text(j, i, f'{value:.1f}',
-                        ha="center", va="center", color=color, fontsize=9, fontweight='bold')
-        
-        # 红灯状态
-        im2 = ax2.imshow(red_states, cmap='RdYlGn', vmin=vmin, vmax=vmax, aspect='auto')
-        ax2.set_xticks(range(4))
-        ax2.set_yticks(range(5))
-        ax2.set_xticklabels(speed_labels, fontsize=9)
-        ax2.set_yticklabels(dist_labels, fontsize=9)
-        ax2.set_xlabel('速度', fontsize=11, fontweight='bold')
-        ax2.set_ylabel('距离路口', fontsize=11, fontweight='bold')
-        ax2.set_title('策略决策: 红灯', fontsize=13, fontweight='bold', color='red')
-        
-        for i in range(5):
-            for j in range(4):
-                value = red_states[i, j]
-                color = 'white' if abs(value) > 1.5 else 'black'
-                ax2.text(j, i, f'{value:.1f}',
-                        ha="center", va="center", color=color, fontsize=9, fontweight='bold')
-        
-        # 颜色条
-        cbar = plt.colorbar(im2, ax=[ax1, ax2], orientation='horizontal', 
-                            pad=0.12, fraction=0.05, aspect=40)
-        cbar.set_label('加速度 (m/s²)', fontsize=11, fontweight='bold')
-        cbar.ax.tick_params(labelsize=9)
-        
-        plt.suptitle('遗传算法交通策略可视化 - 加速度决策热图', 
-                    fontsize=15, fontweight='bold', y=0.98)
-        
-        fig.text(0.5, 0.02, 
-                '颜色说明: 红色=减速 | 黄色=维持 | 绿色=加速 | 数值=加速度(m/s²)',
-                ha='center', fontsize=10, style='italic',
-                bbox=dict(boxstyle='round', facecolor='wheat', alpha=0.5))
-        
-        plt.tight_layout(rect=[0, 0.04, 1, 0.96])
-        plt.savefig(filename, dpi=300, bbox_inches='tight')
-        print(f"\n热力图已保存至: {filename}")
-        plt.close()
-        
-    except ImportError:
+    if _HEATMAP_FIG is None:
         print("\n警告: matplotlib未安装，无法生成热力图")
+        return
+    
+    if states is None:
+        states = chromosome_array(strategy)
+    
+    if states.shape == OLD_STRATEGY_SHAPE:
+        export_old_strategy_heatmap(strategy, filename, states)
+        return
+    elif states.shape != STRATEGY_SHAPE:
+        print(f"警告: 未知的染色体长度 {states.size}")
+        return
+    
+    # 数据矩阵: 5距离 x 4速度
+    green_states, red_states = states
+    
+    # 绘图
+    fig = _HEATMAP_FIG
+    fig.clear()
+    fig.set_size_inches(16, 6)
+    ax1, ax2 = fig.subplots(1, 2)
+    
+    dist_labels = ['0-5m\n(很近)', '5-10m\n(近)', '10-15m\n(中)', '15-20m\n(远)', '20-30m\n(很远)']
+    speed_labels = ['0-3m/s\n(慢)', '3-8m/s\n(中慢)', '8-13m/s\n(中快)', '13-20m/s\n(快)']
+    
+    vmin, vmax = -4.0, 2.0
+    
+    # 绿灯状态
+    im1 = ax1.imshow(green_states, cmap='RdYlGn', vmin=vmin, vmax=vmax, aspect='auto')
+    ax1.set_xticks(range(4))
+    ax1.set_yticks(range(5))
+    ax1.set_xticklabels(speed_labels, fontsize=9)
+    ax1.set_yticklabels(dist_labels, fontsize=9)
+    ax1.set_xlabel('速度', fontsize=11, fontweight='bold')
+    ax1.set_ylabel('距离路口', fontsize=11, fontweight='bold')
+    ax1.set_title('策略决策: 绿灯', fontsize=13, fontweight='bold', color='green')
+    
+    for i in range(5):
+        for j in range(4):
+            value = green_states[i, j]
+            color = 'white' if abs(value) > 1.5 else 'black'
+            ax1.text(j, i, f'{value:.1f}',
+                    ha="center", va="center", color=color, fontsize=9, fontweight='bold')
+    
+    # 红灯状态
+    im2 = ax2.imshow(red_states, cmap='RdYlGn', vmin=vmin, vmax=vmax, aspect='auto')
+    ax2.set_xticks(range(4))
+    ax2.set_yticks(range(5))
+    ax2.set_xticklabels(speed_labels, fontsize=9)
+    ax2.set_yticklabels(dist_labels, fontsize=9)
+    ax2.set_xlabel('速度', fontsize=11, fontweight='bold')
+    ax2.set_ylabel('距离路口', fontsize=11, fontweight='bold')
+    ax2.set_title('策略决策: 红灯', fontsize=13, fontweight='bold', color='red')
+    
+    for i in range(5):
+        for j in range(4):
+            value = red_states[i, j]
+            color = 'white' if abs(value) > 1.5 else 'black'
+            ax2.text(j, i, f'{value:.1f}',
+                    ha="center", va="center", color=color, fontsize=9, fontweight='bold')
+    
+    # 颜色条
+    cbar = fig.colorbar(im2, ax=[ax1, ax2], orientation='horizontal', 
+                        pad=0.12, fraction=0.05, aspect=40)
+    cbar.set_label('加速度 (m/s²)', fontsize=11, fontweight='bold')
+    cbar.ax.tick_params(labelsize=9)
+    
+    fig.suptitle('遗传算法交通策略可视化 - 加速度决策热图', 
+                 fontsize=15, fontweight='bold')
+    
+    # 作为 supxlabel 放在底部，由 constrained_layout 预留空间
+    fig.supxlabel('颜色说明: 红色=减速 | 黄色=维持 | 绿色=加速 | 数值=加速度(m/s²)',
+                  fontsize=10, style='italic',
+                  bbox=dict(boxstyle='round', facecolor='wheat', alpha=0.5))
+    
+    fig.savefig(filename, dpi=HEATMAP_DPI)
+    print(f"\n热力图已保存至: {filename}")
 
 
-def export_old_strategy_heatmap(strategy: GeneticTrafficStrategy, filename: str):
+def export_old_strategy_heatmap(strategy: GeneticTrafficStrategy, filename: str,
+                                states: Optional[np.ndarray] = None):
     """导出旧版策略热力图"""
-    import matplotlib.pyplot as plt
-    import matplotlib
-    
-    green_states = np.zeros((3, 3))
-    red_states = np.zeros((3, 3))
-    
-    for i in range(18):
-        light_idx = i // 9
-        remaining = i % 9
-        dist_idx = remaining // 3
-        speed_idx = remaining % 3
-        
-        if light_idx == 0:
-            green_states[dist_idx, speed_idx] = strategy.chromosome[i]
-        else:
-            red_states[dist_idx, speed_idx] = strategy.chromosome[i]
+    if states is None:
+        states = chromosome_array(strategy)
+    # 3距离 x 3速度
+    green_states, red_states = states
     
-    fig, (ax1, ax2) = plt.subplots(1, 2, figsize=(14, 5))
+    fig = _HEATMAP_FIG
+    fig.clear()
+    fig.set_size_inches(14, 5)
+    ax1, ax2 = fig.subplots(1, 2)
     
     dist_labels = ['0-10m', '10-20m', '20-30m']
     speed_labels = ['0-5m/s', '5-15m/s', '15-20m/s']
@@ -354,11 +349,9 @@ def export_old_strategy_heatmap(strategy: GeneticTrafficStrategy, filename: str)
             ax2.text(j, i, action_names[int(red_states[i, j])],
                     ha="center", va="center", color="black", fontsize=10)
     
-    plt.suptitle('策略可视化（旧版）', fontsize=16, fontweight='bold')
-    plt.tight_layout()
-    plt.savefig(filename, dpi=300, bbox_inches='tight')
+    fig.suptitle('策略可视化（旧版）', fontsize=16, fontweight='bold')
+    fig.savefig(filename, dpi=HEATMAP_DPI)
     print(f"\n热力图已保存至: {filename}")
-    plt.close()
 
 
 if __name__ == "__main__":
@@ -378,16 +371,18 @@ if __name__ == "__main__":
         # 加载策略
         print(f"加载策略: {args.strategy_file}")
         strategy = GeneticTrafficStrategy.load(args.strategy_file)
+        # 只转换一次，供下面各函数共用
+        states = chromosome_array(strategy)
         
         # 可视化决策表
-        visualize_strategy(strategy)
+        visualize_strategy(strategy, states)
         
         # 分析策略模式
-        analyze_strategy_patterns(strategy)
+        analyze_strategy_patterns(strategy, states)
         
         # 生成热力图
         if args.heatmap:
-            export_strategy_heatmap(strategy, args.output)
+            export_strategy_heatmap(strategy, args.output, states)
         
         print("\n" + "="*90)
         print("可视化完成")
@@ -6,6 +6,8 @@
  * 
  * Event Types:
  * - message: { type: "message", from: "veh_id", to: "veh_id" | "broadcast", msgType: "PREPARE"|"COMMIT"|"REPLY", data: any }
+ * - multicast: { type: "multicast", from: ["veh_id", ...], to: "veh_id" | ["veh_id", ...] | "broadcast", msgType: ..., data: any }
+ *   (one event standing for the same message sent by every vehicle in `from`)
  * - state_change: { type: "state_change", vehicle: "veh_id", state: "idle"|"preparing"|"prepared"|"committing"|"committed"|"failed" }
  * - consensus_progress: { type: "consensus_progress", phase: "prepare"|"commit"|"reply", current: number, required: number }
  * - decision_zone: { type: "decision_zone", vehicles: ["veh_id", ...], active: boolean }
@@ -101,6 +103,15 @@ export class ConsensusVisualizer {
                     // Update analytics
                     this.updateMessageStats(event);
                     break;
+                case 'multicast':
+                    // Expand into one message per sender
+                    (event.from || []).forEach(sender => {
+                        const message = { type: 'message', from: sender, to: event.to, msgType: event.msgType, data: event.data };
+                        this.addMessageParticle(message, now);
+                        this.logEvent(message, now);
+                        this.updateMessageStats(message);
+                    });
+                    break;
                 case 'state_change':
                     this.updateVehicleState(event, now);
                     this.logEvent(event, now);
@@ -205,6 +216,21 @@ export class ConsensusVisualizer {
                     });
                 }
             });
+        } else if (Array.isArray(to)) {
+            // Explicit list of recipients
+            to.forEach(recipient => {
+                if (recipient !== from) {
+                    this.messageParticles.push({
+                        from: from,
+                        to: recipient,
+                        color: color,
+                        msgType: msgType,
+                        progress: 0,
+                        timestamp: timestamp,
+                        data: data
+                    });
+                }
+            });
         } else {
             this.messageParticles.push({
                 from: from,
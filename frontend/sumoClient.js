@@ -4,6 +4,8 @@
 let socket = null;
 let latestState = { step: 0, vehicles: [] };
 const subscribers = new Set();
+// Vehicles streamed by sumo_bridge.py, rebuilt from keyframes + deltas
+const bridgeVehicles = new Map();
 
 function notifySubscribers() {
     subscribers.forEach((cb) => {
@@ -15,6 +17,19 @@ function notifySubscribers() {
     });
 }
 
+function applyBridgeTraffic(traffic) {
+    if (Array.isArray(traffic.vehicles)) {
+        // Keyframe: full snapshot
+        bridgeVehicles.clear();
+        traffic.vehicles.forEach((v) => bridgeVehicles.set(v.id, v));
+    } else {
+        (traffic.removed || []).forEach((id) => bridgeVehicles.delete(id));
+        (traffic.added || []).forEach((v) => bridgeVehicles.set(v.id, v));
+        (traffic.updated || []).forEach((v) => bridgeVehicles.set(v.id, v));
+    }
+    return Array.from(bridgeVehicles.values());
+}
+
 export function subscribeSumo(callback) {
     subscribers.add(callback);
     callback(latestState);
@@ -37,6 +52,7 @@ export function connectToSumo(url, onStatusChange) {
     }
 
     onStatusChange && onStatusChange("connecting");
+    bridgeVehicles.clear();
     socket = new WebSocket(url);
 
     socket.onopen = () => {
@@ -55,7 +71,18 @@ export function connectToSumo(url, onStatusChange) {
     socket.onmessage = (event) => {
         try {
             const data = JSON.parse(event.data);
-            if (data && Array.isArray(data.vehicles)) {
+            if (data && data.traffic) {
+                // sumo_bridge.py frame
+                latestState = {
+                    step: data.step ?? 0,
+                    traffic: {
+                        vehicles: applyBridgeTraffic(data.traffic),
+                        traffic_lights: data.traffic.traffic_lights || {},
+                    },
+                    consensus: data.consensus,
+                };
+                notifySubscribers();
+            } else if (data && Array.isArray(data.vehicles)) {
                 latestState = {
                     step: data.step ?? 0,
                     vehicles: data.vehicles,
@@ -8,12 +8,19 @@ vehicle locations alongside the PBFT animation.
 Usage examples:
     python sumo_bridge.py --config path/to/scenario.sumocfg
     python sumo_bridge.py --config path/to/scenario.sumocfg --gui --port 8765
+    python sumo_bridge.py --config path/to/scenario.sumocfg --sumo-port 49152
 
-Expected WebSocket payload (sent each tick):
-    {"step": 0, "vehicles": [{"id": "veh0", "x": 12.3, "y": 4.5, "speed": 10.0}]}
+Expected WebSocket payload (sent each broadcast tick):
+    keyframe: {"step": 0, "traffic": {"vehicles": [{"id": "veh0", "x": 12.3, "y": 4.5,
+               "speed": 10.0, "angle": 90.0}], "traffic_lights": {...}}, "consensus": {...}}
+    delta:    {"step": 3, "traffic": {"added": [...], "removed": ["veh0"],
+               "updated": [...], "traffic_lights": {...}}, "consensus": {...}}
+    Keyframes are sent periodically, to newly connected clients, and to any
+    client whose previous frame was dropped because it was not sent in time.
 
 Dependencies:
     pip install websockets
+    pip install orjson  (optional, faster JSON encode/decode)
     SUMO must be installed and SUMO_HOME set. TraCI is bundled with SUMO.
 """
 
@@ -22,16 +29,17 @@ import asyncio
 import json
 import os
 import sys
-import socket
+import threading
 import time
-from typing import Dict, List, Any
+from operator import itemgetter
+from queue import Empty, SimpleQueue
+from typing import Dict, List, Any, Optional, Tuple
 
 # Global variable to store latest consensus data
 latest_consensus_data: Dict[str, Any] = {
     "phase": "idle",
     "proposal_dir": "",
     "nodes": [],
-    "links": [],
     "metrics": {
         "decision_latency_ms": 0,
         "topology_stability_score": 0,
@@ -39,154 +47,402 @@ latest_consensus_data: Dict[str, Any] = {
     }
 }
 
+# Aggregated V2V links keyed by (from, to); sent as consensus["links"] (a list) on broadcast
+_links_map: Dict[Tuple[str, str], Dict[str, Any]] = {}
+
 try:
     import traci  # type: ignore
+    import traci.constants as tc  # type: ignore
     from sumolib import checkBinary  # type: ignore
 except ImportError as exc:  # pragma: no cover - environment-specific
     raise SystemExit(
         "SUMO/TraCI not found. Install SUMO and ensure SUMO_HOME is set."
     ) from exc
 
+try:
+    import orjson  # type: ignore
+except ImportError:  # pragma: no cover - optional speedup
+    orjson = None
 
-async def udp_listener():
-    """Background task to listen for OMNeT++ UDP packets on port 8766"""
-    global latest_consensus_data
-    
-    # Setup UDP socket
-    sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
-    sock.bind(("127.0.0.1", 8766))
-    sock.setblocking(False)
-    
-    while True:
-        try:
-            # Check for data without blocking
-            data, addr = sock.recvfrom(8192)
-            payload = json.loads(data.decode('utf-8'))
-            
-            if payload.get("type") == "view_change":
-                # Handle view change event if needed
-                pass
-            elif payload.get("type") == "topology_update" and "consensus" in payload:
-                # Aggregate links from different vehicles
-                if "links" in payload["consensus"]:
-                    new_links = payload["consensus"]["links"]
-                    # Convert existing links to a dictionary keyed by (from, to) for easy updating
-                    links_dict = { (l["from"], l["to"]): l for l in latest_consensus_data.get("links", []) }
-                    for link in new_links:
-                        links_dict[(link["from"], link["to"])] = link
-                    latest_consensus_data["links"] = list(links_dict.values())
-            elif "consensus" in payload:
-                # Update latest consensus data
-                for key, value in payload["consensus"].items():
-                    # Don't overwrite the aggregated links with empty/missing ones
-                    if key != "links" or not latest_consensus_data.get("links"):
-                        latest_consensus_data[key] = value
-                
-                # Apply traffic light commands immediately based on phase
-                phase = latest_consensus_data.get("phase", "idle")
-                apply_traffic_lights(phase, latest_consensus_data.get("proposal_dir", ""))
+if orjson is not None:
+    def dumps_payload(payload: Dict[str, Any]) -> str:
+        # Browsers deliver binary frames as Blobs, so keep sending text frames
+        return orjson.dumps(payload).decode("utf-8")
+
+    loads_packet = orjson.loads
+else:
+    dumps_payload = json.dumps
+
+    def loads_packet(data: bytes) -> Any:
+        return json.loads(data.decode("utf-8"))
+
+# Vehicle variables streamed to clients, read from TraCI subscriptions
+VEHICLE_VARS = (tc.VAR_POSITION, tc.VAR_SPEED, tc.VAR_ANGLE)
+
+# Delta streaming: a vehicle is resent once it moved/changed beyond these thresholds
+POS_EPS = 0.05    # m, |dx| + |dy|
+SPEED_EPS = 0.05  # m/s
+ANGLE_EPS = 0.5   # degrees
+KEYFRAME_INTERVAL = 20  # broadcasts between full snapshots (5 s at 4 Hz)
+
+# Broadcast frequency limiter (e.g. 4Hz = 0.25s)
+BROADCAST_INTERVAL = 0.25
+
+# Traffic light states requested from the event loop, applied by the simulation thread
+# (a TraCI connection must only be used from one thread)
+_tl_commands: "SimpleQueue[str]" = SimpleQueue()
+
+# Window for coalescing a burst of OMNeT++ datagrams before aggregating them (s)
+UDP_BATCH_WINDOW = 0.005
+
+# Seconds to keep retrying the TraCI attach before giving up
+CONNECT_TIMEOUT = 30.0
+
+# ID of the traffic light shown in the frontend (first one in the network), set in main()
+TL_ID: Optional[str] = None
+
+# Precomputed signal strings for the 12-link crossroad TL program.
+# Assuming N=0-2, E=3-5, S=6-8, W=9-11 map depending on crossroad.net.xml
+# You might need to adjust the exact string based on your crossing
+TL_STATES = {
+    "N": "GGGrrrrrrrrr",
+    "E": "rrrGGGrrrrrr",
+    "S": "rrrrrrGGGrrr",
+    "W": "rrrrrrrrrGGG",
+}
+TL_NEGOTIATE = "yyyyyyyyyyyy"  # Yellow blinking for negotiation
+TL_ALL_RED = "rrrrrrrrrrrr"
+
+# First link of each N/E/S/W group in a (padded) 12-char state string
+_TL_PICK = itemgetter(0, 3, 6, 9)
+
+
+class ConsensusProto(asyncio.DatagramProtocol):
+    """Receives OMNeT++ UDP packets on port 8766 and aggregates each burst once"""
+
+    def __init__(self) -> None:
+        self._pending: List[bytes] = []
+        self._flush_handle: Optional[asyncio.TimerHandle] = None
+
+    def datagram_received(self, data: bytes, addr) -> None:
+        # Nodes tend to report in the same instant: collect the burst, aggregate it once
+        self._pending.append(data)
+        if self._flush_handle is None:
+            self._flush_handle = asyncio.get_running_loop().call_later(UDP_BATCH_WINDOW, self._flush)
+
+    def _flush(self) -> None:
+        global latest_consensus_data
+
+        self._flush_handle = None
+        packets, self._pending = self._pending, []
+        consensus_updated = False
+
+        for data in packets:
+            try:
+                payload = loads_packet(data)
                 
-        except BlockingIOError:
-            pass # No data available
-        except Exception as e:
-            print(f"UDP Error: {e}")
-            
-        await asyncio.sleep(0.01) # Poll at 100Hz
+                if payload.get("type") == "view_change":
+                    # Handle view change event if needed
+                    pass
+                elif payload.get("type") == "topology_update" and "consensus" in payload:
+                    # Aggregate links from different vehicles
+                    for link in payload["consensus"].get("links", ()):
+                        _links_map[(link["from"], link["to"])] = link
+                elif "consensus" in payload:
+                    # Update latest consensus data
+                    for key, value in payload["consensus"].items():
+                        if key != "links":
+                            latest_consensus_data[key] = value
+                        elif not _links_map:
+                            # Only seed the links; don't overwrite aggregated ones
+                            for link in value:
+                                _links_map[(link["from"], link["to"])] = link
+                    consensus_updated = True
+                    
+            except Exception as e:
+                print(f"UDP Error: {e}")
+
+        if consensus_updated:
+            # Apply traffic light commands immediately based on the final phase of the burst
+            phase = latest_consensus_data.get("phase", "idle")
+            apply_traffic_lights(phase, latest_consensus_data.get("proposal_dir", ""))
+
+    def error_received(self, exc: Exception) -> None:
+        print(f"UDP Error: {exc}")
+
+    def connection_lost(self, exc: Optional[Exception]) -> None:
+        if self._flush_handle is not None:
+            self._flush_handle.cancel()
+            self._flush_handle = None
+
+def subscribe_vehicles() -> None:
+    """Subscribe every vehicle that departed during the last simulation step"""
+    for vid in traci.simulation.getSubscriptionResults().get(tc.VAR_DEPARTED_VEHICLES_IDS, ()):
+        traci.vehicle.subscribe(vid, VEHICLE_VARS)
 
 def apply_traffic_lights(phase: str, proposal_dir: str):
-    """Control SUMO traffic lights via TraCI based on PBFT phases"""
+    """Control SUMO traffic lights based on PBFT phases (sent by the simulation thread before its next step)"""
+    if TL_ID is None:
+        return
+    if phase in ("pre_prepare", "prepare"):
+        _tl_commands.put(TL_NEGOTIATE)
+    elif phase == "commit" and proposal_dir:
+        # Set green for the winning direction
+        _tl_commands.put(TL_STATES.get(proposal_dir, TL_ALL_RED))
+
+def flush_tl_commands() -> None:
+    """Apply the newest requested traffic light state; runs on the simulation thread"""
+    state = None
     try:
-        # Assuming the traffic light ID in crossroad is 'J1' for example, check your specific sim
-        tl_id = traci.trafficlight.getIDList()[0] # Grab first one
-        
-        if phase in ["pre_prepare", "prepare"]:
-            # Yellow blinking for negotiation
-            traci.trafficlight.setRedYellowGreenState(tl_id, "yyyyyyyyyyyy")
-        elif phase == "commit" and proposal_dir:
-            # Set green for the winning direction
-            # Assuming N=0-2, E=3-5, S=6-8, W=9-11 map depending on crossroad.net.xml
-            # You might need to adjust the exact string based on your crossing
-            state_list = ["r"] * 12
-            if proposal_dir == "N":
-                for i in range(0, 3): state_list[i] = "G"
-            elif proposal_dir == "S":
-                for i in range(6, 9): state_list[i] = "G"
-            elif proposal_dir == "E":
-                for i in range(3, 6): state_list[i] = "G"
-            elif proposal_dir == "W":
-                for i in range(9, 12): state_list[i] = "G"
-            traci.trafficlight.setRedYellowGreenState(tl_id, "".join(state_list))
+        while True:
+            state = _tl_commands.get_nowait()
+    except Empty:
+        pass
+    if state is None:
+        return
+    try:
+        traci.trafficlight.setRedYellowGreenState(TL_ID, state)
     except Exception as e:
         print(f"TraCI TL Error: {e}")
 
-async def stream_state(step_length: float, clients: "set[asyncio.Queue[str]]") -> None:
+def vehicle_entry(vid: str, values: Dict[int, Any]) -> Tuple[Dict[str, Any], Tuple[float, float, float, float]]:
+    """Build the client-facing dict for one vehicle and the tuple used for delta checks"""
+    x, y = values[tc.VAR_POSITION]
+    speed = values[tc.VAR_SPEED]
+    angle = values[tc.VAR_ANGLE]  # SUMO angle: 0=North, clockwise in degrees
+    state = (float(x), float(y), float(speed), float(angle))
+    return {"id": vid, "x": state[0], "y": state[1], "speed": state[2], "angle": state[3]}, state
+
+def snapshot_vehicles(
+    results: Dict[str, Dict[int, Any]],
+    prev: Optional[Dict[str, Tuple[float, float, float, float]]] = None,
+) -> List[Dict[str, Any]]:
+    """Full vehicle list for a keyframe; when prev is given it is reset to the sent states"""
+    if prev is not None:
+        prev.clear()
+    vehicles: List[Dict[str, Any]] = []
+    for vid, values in results.items():
+        entry, state = vehicle_entry(vid, values)
+        vehicles.append(entry)
+        if prev is not None:
+            prev[vid] = state
+    return vehicles
+
+def diff_vehicles(
+    results: Dict[str, Dict[int, Any]],
+    prev: Dict[str, Tuple[float, float, float, float]],
+) -> Tuple[List[Dict[str, Any]], List[str], List[Dict[str, Any]]]:
+    """Compare subscription results with the last sent states; updates prev in place"""
+    added: List[Dict[str, Any]] = []
+    updated: List[Dict[str, Any]] = []
+    for vid, values in results.items():
+        entry, state = vehicle_entry(vid, values)
+        last = prev.get(vid)
+        if last is None:
+            added.append(entry)
+        elif (abs(state[0] - last[0]) + abs(state[1] - last[1]) > POS_EPS
+              or abs(state[2] - last[2]) > SPEED_EPS
+              or abs(state[3] - last[3]) > ANGLE_EPS):
+            updated.append(entry)
+        else:
+            continue
+        # Only remember what was actually sent, so slow drift still gets through
+        prev[vid] = state
+
+    removed = [vid for vid in prev if vid not in results]
+    for vid in removed:
+        del prev[vid]
+    return added, removed, updated
+
+def make_payload(step: int, traffic: Dict[str, Any], consensus: Dict[str, Any]) -> str:
+    return dumps_payload({
+        "step": step,
+        "traffic": traffic,
+        "consensus": consensus
+    })
+
+def put_latest(queue: asyncio.Queue, item: Any) -> None:
+    """Put into a single-slot queue, replacing an item that was not consumed yet"""
+    if queue.full():
+        queue.get_nowait()
+    queue.put_nowait(item)
+
+def sim_worker(
+    loop: asyncio.AbstractEventLoop,
+    snapshot_q: asyncio.Queue,
+    step_length: float,
+    stop: threading.Event,
+) -> None:
+    """
+    Simulation thread: owns every TraCI call after startup.
+
+    Steps SUMO and hands (step, vehicle results, TL state) snapshots to the event loop
+    at BROADCAST_INTERVAL; None marks the end of the simulation.
+    """
     step = 0
-    
-    # Broadcast frequency limiter (e.g. 4Hz = 0.25s)
-    BROADCAST_INTERVAL = 0.25
     last_broadcast_time = time.time()
+    try:
+        while not stop.is_set() and traci.simulation.getMinExpectedNumber() > 0:
+            flush_tl_commands()
+            traci.simulationStep()
+            # Departures are only reported for the step they happen in
+            subscribe_vehicles()
+
+            current_time = time.time()
+
+            # Only broadcast at fixed interval
+            if current_time - last_broadcast_time >= BROADCAST_INTERVAL:
+                last_broadcast_time = current_time
+                # Subscription results arrive with the simulationStep response: no extra round-trips.
+                # Copied because TraCI refills its cache on the next step.
+                results = dict(traci.vehicle.getAllSubscriptionResults())
+                tl_state = traci.trafficlight.getRedYellowGreenState(TL_ID) if TL_ID is not None else None
+                # A slow event loop only ever sees the newest snapshot
+                loop.call_soon_threadsafe(put_latest, snapshot_q, (step, results, tl_state))
+
+            step += 1
+            time.sleep(step_length)
+    finally:
+        loop.call_soon_threadsafe(put_latest, snapshot_q, None)
+
+async def stream_state(snapshot_q: asyncio.Queue, clients: "Dict[Any, asyncio.Queue]") -> None:
+    """Encode simulation snapshots and fan them out to the WebSocket clients"""
+    # Last vehicle state sent to clients, keyed by vehicle ID: (x, y, speed, angle)
+    prev: Dict[str, Tuple[float, float, float, float]] = {}
+    frames_since_keyframe = KEYFRAME_INTERVAL  # first broadcast is a keyframe
+    # Clients whose last queued frame lets them apply the next delta
+    synced: "set[Any]" = set()
     
-    while traci.simulation.getMinExpectedNumber() > 0:
-        traci.simulationStep()
-        
-        current_time = time.time()
-        
-        # Only broadcast at fixed interval
-        if current_time - last_broadcast_time >= BROADCAST_INTERVAL:
-            last_broadcast_time = current_time
-            
-            vehicles: List[Dict[str, float]] = []
-            for vid in traci.vehicle.getIDList():
-                x, y = traci.vehicle.getPosition(vid)
-                speed = traci.vehicle.getSpeed(vid)
-                angle = traci.vehicle.getAngle(vid)  # SUMO angle: 0=North, clockwise in degrees
-                vehicles.append({"id": vid, "x": float(x), "y": float(y), "speed": float(speed), "angle": float(angle)})
-
-            # Build dict mapping
-            tls_dict = {}
-            if len(traci.trafficlight.getIDList()) > 0:
-                tl_id = traci.trafficlight.getIDList()[0]
-                tl_state = traci.trafficlight.getRedYellowGreenState(tl_id)
-                # Parse to compass directions (assuming standard layout N, E, S, W)
-                # You must tailor this logic to your net.xml TL program
-                tls_dict = {
-                    "N": tl_state[0], # Using first char of group
-                    "E": tl_state[3] if len(tl_state)>3 else 'r',
-                    "S": tl_state[6] if len(tl_state)>6 else 'r',
-                    "W": tl_state[9] if len(tl_state)>9 else 'r'
-                }
-
-            payload_dict = {
-                "step": step, 
-                "traffic": {
-                    "vehicles": vehicles,
-                    "traffic_lights": tls_dict
-                },
-                "consensus": latest_consensus_data
-            }
-            
-            payload = json.dumps(payload_dict)
-            for queue in clients:
-                await queue.put(payload)
-
-        step += 1
-        await asyncio.sleep(step_length)
-
-
-async def websocket_handler(websocket, path, clients: "set[asyncio.Queue[str]]"):
-    queue: asyncio.Queue[str] = asyncio.Queue()
-    clients.add(queue)
+    while True:
+        snapshot = await snapshot_q.get()
+        if snapshot is None:
+            break
+        step, results, tl_state = snapshot
+
+        # Build dict mapping
+        tls_dict = {}
+        if tl_state is not None:
+            # Parse to compass directions (assuming standard layout N, E, S, W)
+            # You must tailor this logic to your net.xml TL program
+            n_, e_, s_, w_ = _TL_PICK(tl_state.ljust(12, 'r'))
+            tls_dict = {"N": n_, "E": e_, "S": s_, "W": w_}
+
+        # Materialize the link list once per broadcast
+        consensus = {**latest_consensus_data, "links": list(_links_map.values())}
+
+        key_payload: Optional[str] = None
+        if frames_since_keyframe >= KEYFRAME_INTERVAL:
+            frames_since_keyframe = 0
+            payload = key_payload = make_payload(
+                step, {"vehicles": snapshot_vehicles(results, prev), "traffic_lights": tls_dict},
+                consensus,
+            )
+        else:
+            frames_since_keyframe += 1
+            added, removed, updated = diff_vehicles(results, prev)
+            payload = make_payload(
+                step, {"added": added, "removed": removed, "updated": updated, "traffic_lights": tls_dict},
+                consensus,
+            )
+
+        # Hand the frame to each client's single-slot mailbox without waiting on slow sockets
+        synced.intersection_update(clients)
+        for ws, queue in list(clients.items()):
+            frame = payload
+            if ws not in synced or queue.full():
+                # New client, or its unsent frame gets replaced: the delta chain is broken,
+                # so give it a full snapshot instead
+                if key_payload is None:
+                    key_payload = make_payload(
+                        step, {"vehicles": snapshot_vehicles(results), "traffic_lights": tls_dict},
+                        consensus,
+                    )
+                frame = key_payload
+                synced.add(ws)
+            put_latest(queue, frame)
+
+
+async def send_frames(websocket, queue: asyncio.Queue) -> None:
+    """Forward queued frames to one client; stops when the connection fails"""
     try:
         while True:
-            message = await queue.get()
-            await websocket.send(message)
+            await websocket.send(await queue.get())
+    except Exception:
+        pass
+
+
+async def websocket_handler(websocket, path, clients: "Dict[Any, asyncio.Queue]"):
+    # Holds at most the newest frame, so a slow client skips frames instead of piling them up
+    queue: asyncio.Queue = asyncio.Queue(maxsize=1)
+    clients[websocket] = queue
+    sender = asyncio.create_task(send_frames(websocket, queue))
+    try:
+        await websocket.wait_closed()
     except asyncio.CancelledError:
         pass
     finally:
-        clients.discard(queue)
+        sender.cancel()
+        clients.pop(websocket, None)
+
+
+def read_launchd_port() -> Optional[int]:
+    """Read the TraCI port from the JSON status file named by $SUMO_LAUNCHD_STATUS ({"port": ...})"""
+    path = os.environ.get("SUMO_LAUNCHD_STATUS")
+    if not path:
+        return None
+    try:
+        with open(path, "rb") as f:
+            return int(loads_packet(f.read())["port"])
+    except (OSError, ValueError, KeyError, TypeError):
+        # Not written yet (or mid-write), retried by the caller
+        return None
+
+def scan_sumo_port() -> Optional[int]:
+    """Last resort: find a running sumo/sumo-gui process and take its --remote-port argument"""
+    try:
+        import psutil  # type: ignore
+    except ImportError:
+        return None
+
+    for proc in psutil.process_iter(['name', 'cmdline']):
+        try:
+            name = (proc.info.get('name') or '').lower()
+            cmd = proc.info.get('cmdline') or []
+            if 'sumo' in name:
+                for i, arg in enumerate(cmd):
+                    if arg in ('--remote-port', '-remote-port') and i + 1 < len(cmd):
+                        return int(cmd[i + 1])
+        except (psutil.NoSuchProcess, psutil.AccessDenied, ValueError):
+            continue
+    return None
 
+def attach_traci(sumo_port: Optional[int]) -> int:
+    """Attach to the SUMO instance as TraCI client #2, retrying for at most CONNECT_TIMEOUT seconds"""
+    print("Waiting for OMNeT++ (via sumo-launchd.py) to launch SUMO and expose the TraCI port...")
+    deadline = time.monotonic() + CONNECT_TIMEOUT
+    while True:
+        port = sumo_port
+        if port is None:
+            port = read_launchd_port() if "SUMO_LAUNCHD_STATUS" in os.environ else scan_sumo_port()
+        if port is not None:
+            try:
+                # sumo-launchd uses the local loopback; one attempt per loop so the deadline holds
+                traci.init(port=port, host="127.0.0.1", numRetries=0, label="bridge")
+                traci.setOrder(2)
+                return port
+            except Exception:
+                # SUMO not fully ready, sleep and retry
+                pass
+        if time.monotonic() >= deadline:
+            raise SystemExit(
+                f"Could not attach to SUMO TraCI within {CONNECT_TIMEOUT:.0f} s. "
+                "Pass --sumo-port or set SUMO_LAUNCHD_STATUS."
+            )
+        time.sleep(1)
 
 async def main():
+    global TL_ID
+
     parser = argparse.ArgumentParser(description="SUMO to WebSocket bridge")
     parser.add_argument("--config", required=True, help="Path to .sumocfg file")
     parser.add_argument("--port", type=int, default=8765, help="WebSocket port")
@@ -197,47 +453,26 @@ async def main():
         default=0.1,
         help="Seconds between streamed frames",
     )
+    parser.add_argument(
+        "--sumo-port",
+        type=int,
+        default=None,
+        help="TraCI port of the SUMO instance (default: read from $SUMO_LAUNCHD_STATUS)",
+    )
     args = parser.parse_args()
 
-    import time
-    import psutil
-    
-    print("Waiting for OMNeT++ (via sumo-launchd.py) to launch SUMO and expose the TraCI port...")
-    connected = False
-    sumo_port = None
-    
-    while not connected:
-        # Scan for sumo or sumo-gui processes
-        for proc in psutil.process_iter(['name', 'cmdline']):
-            try:
-                name = proc.info.get('name', '').lower()
-                cmd = proc.info.get('cmdline') or []
-                
-                if 'sumo' in name:
-                    # Look for the port argument (usually -remote-port or --remote-port)
-                    for i, arg in enumerate(cmd):
-                        if (arg == '--remote-port' or arg == '-remote-port') and i + 1 < len(cmd):
-                            sumo_port = int(cmd[i+1])
-                            break
-                    if sumo_port:
-                        break
-            except (psutil.NoSuchProcess, psutil.AccessDenied):
-                continue
-                
-        if sumo_port:
-            try:
-                # Try to connect to the discovered port (sumo-launchd uses the local loopback)
-                traci.init(port=sumo_port, host="127.0.0.1", numClients=2, label="bridge")
-                traci.setOrder(2)
-                connected = True
-                print(f"✅ Successfully attached to SUMO TraCI on port {sumo_port} as Client #2")
-            except Exception as e:
-                # Mismatch or SUMO not fully ready, sleep and retry
-                time.sleep(1)
-        else:
-            time.sleep(1)
+    sumo_port = attach_traci(args.sumo_port)
+    print(f"✅ Successfully attached to SUMO TraCI on port {sumo_port} as Client #2")
+
+    # Subscribe once; vehicle data is then delivered with every simulation step
+    traci.simulation.subscribe((tc.VAR_DEPARTED_VEHICLES_IDS,))
+    for vid in traci.vehicle.getIDList():
+        traci.vehicle.subscribe(vid, VEHICLE_VARS)
+
+    tl_ids = traci.trafficlight.getIDList()
+    TL_ID = tl_ids[0] if tl_ids else None
 
-    clients: set[asyncio.Queue[str]] = set()
+    clients: "Dict[Any, asyncio.Queue]" = {}
 
     import websockets
 
@@ -247,13 +482,25 @@ async def main():
         port=args.port,
     )
     
-    # Start UDP listener task
-    udp_task = asyncio.create_task(udp_listener())
+    # Listen for OMNeT++ consensus packets
+    udp_transport, _ = await asyncio.get_running_loop().create_datagram_endpoint(
+        ConsensusProto,
+        local_addr=("127.0.0.1", 8766),
+    )
+
+    # TraCI stepping runs on its own thread so blocking RPCs never stall the WebSockets
+    loop = asyncio.get_running_loop()
+    snapshot_q: asyncio.Queue = asyncio.Queue(maxsize=1)
+    stop = threading.Event()
+    sim_future = loop.run_in_executor(None, sim_worker, loop, snapshot_q, args.step_length, stop)
 
     try:
-        await stream_state(args.step_length, clients)
+        await stream_state(snapshot_q, clients)
+        await sim_future  # re-raise a TraCI error from the simulation thread
     finally:
-        udp_task.cancel()
+        stop.set()
+        await asyncio.wait([sim_future])
+        udp_transport.close()
         server.close()
         await server.wait_closed()
         traci.close()